@@ -1,43 +1,147 @@
 import argparse
 import csv
+import io
+import json
 import logging
+import queue
 import re
-from typing import List, Dict, Any, Optional, Set
-from datetime import datetime
-from Bio import Entrez
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import threading
+import time
+import xml.etree.ElementTree as ET
+from typing import List, Dict, Any, Optional, FrozenSet, Iterator, Iterable
+from collections import deque
+from functools import lru_cache
+from itertools import islice
+from urllib.parse import urlencode
+from urllib.request import urlopen
+from concurrent.futures import ThreadPoolExecutor
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
+# Affiliation indicators, compiled once per process. Patterns are lowercase and
+# matched case-sensitively, since affiliations are lowercased before matching.
+_ACADEMIC_RE = re.compile(
+    r'\b(?:university|college|institut|academy|school'
+    r'|hospital|medical center|clinic'
+    r'|research center|laboratory|department'
+    r'|faculty|division)\b'
+)
+_COMPANY_RE = re.compile(
+    r'\b(?:pharma|pharmaceutical|biotech|biotechnology'
+    r'|therapeutics|biosciences|biologics'
+    r'|inc|corp|ltd|gmbh|s\.a\.|llc|co\.|company|plc'
+    r'|drug discovery|r&d'
+    r'|labs|laboratories'
+    r'|research|development)\b'
+)
+
+# Email pattern, compiled once per process. Prefixed ("Email:") and bracketed
+# forms are covered too, since ":", "[", "(" and "<" never match [\w\.-].
+_EMAIL_RE = re.compile(r'[\w\.-]+@[\w\.-]+\.\w+')
+# Used with fullmatch, which unlike '$' does not accept a trailing newline
+_EMAIL_VALID = re.compile(r'[\w\.-]+@[\w\.-]+\.\w+')
+
+# Affiliation strings repeat heavily across authors and articles
+@lru_cache(maxsize=8192)
+def _classify(clean: str) -> bool:
+    """Return True if a normalized affiliation matches company indicators only."""
+    if _ACADEMIC_RE.search(clean):
+        return False
+    return bool(_COMPANY_RE.search(clean))
+
+@lru_cache(maxsize=8192)
+def _extract_emails(text: str) -> FrozenSet[str]:
+    """Return the valid email addresses found in text."""
+    candidates = (match.strip('.,()<>[]{}').lower() for match in _EMAIL_RE.findall(text))
+    # Stripping leading dots can leave an empty local part
+    return frozenset(filter(_EMAIL_VALID.fullmatch, candidates))
+
+def _element_text(elem: Optional[ET.Element]) -> str:
+    """Return the full text of an XML element, including inline markup like <i>."""
+    if elem is None:
+        return ""
+    return "".join(elem.itertext()).strip()
+
+def _prefetch(items: Iterable[Any], maxsize: int = 64) -> Iterator[Any]:
+    """Drain items on a background thread, so producing overlaps with consuming.
+
+    An exception raised while producing is re-raised in the consumer.
+    """
+    buffer = queue.Queue(maxsize=maxsize)
+    done = object()
+    failure = []
+
+    def produce():
+        try:
+            for item in items:
+                buffer.put(item)
+        except Exception as e:
+            failure.append(e)
+        finally:
+            buffer.put(done)
+
+    threading.Thread(target=produce, daemon=True).start()
+    while True:
+        item = buffer.get()
+        if item is done:
+            if failure:
+                raise failure[0]
+            return
+        yield item
+
+# PubMed uses both abbreviated ("Jan") and full ("January") month names
+_MONTHS = {
+    "Jan": "01", "January": "01", "Feb": "02", "February": "02",
+    "Mar": "03", "March": "03", "Apr": "04", "April": "04",
+    "May": "05", "Jun": "06", "June": "06", "Jul": "07", "July": "07",
+    "Aug": "08", "August": "08", "Sep": "09", "September": "09",
+    "Oct": "10", "October": "10", "Nov": "11", "November": "11",
+    "Dec": "12", "December": "12"
+}
+
+# Placeholder values that mark a required CSV field as missing
+_MISSING_VALUES = frozenset({"Unknown", "None", "", None})
+_REQUIRED_FIELDS = ("PubmedID", "Title", "Publication Date",
+                    "Non-academic Authors", "Company Affiliations")
+
 class PubMedScraper:
+    EUTILS_URL = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/"
+    REQUEST_TIMEOUT = 60
+    # NCBI recommends at most 200 IDs per efetch and 3 requests/second without an API key
+    EFETCH_BATCH_SIZE = 200
+    EFETCH_WORKERS = 3
+    MIN_REQUEST_INTERVAL = 1 / 3
+    # Large output buffer so CSV rows reach the file in a handful of writes
+    CSV_BUFFER_SIZE = 1 << 20
+
     def __init__(self, email: str = "your_email@example.com"):
         """Initialize the PubMed scraper with configuration."""
         self.email = email
-        Entrez.email = email
+        self._request_lock = threading.Lock()
+        self._last_request = 0.0
 
-    def parse_publication_date(self, article_data: Dict) -> str:
-        """Extract and format publication date from article data."""
+    def parse_publication_date(self, article_data: ET.Element) -> str:
+        """Extract and format publication date from an <Article> element."""
         try:
-            pub_date = article_data.get("Journal", {}).get("JournalIssue", {}).get("PubDate", {})
-            if "Year" in pub_date:
-                year = pub_date.get("Year", "")
-                month = pub_date.get("Month", "01")
-                day = pub_date.get("Day", "01")
+            pub_date = article_data.find("Journal/JournalIssue/PubDate")
+            if pub_date is None:
+                return "Unknown"
+            year = pub_date.findtext("Year")
+            medline_date = pub_date.findtext("MedlineDate")
+            if year:
+                month = pub_date.findtext("Month", "01")
+                day = pub_date.findtext("Day", "01")
 
                 # Convert month name to number if needed
                 if month.isalpha():
-                    try:
-                        month = str(datetime.strptime(month, "%B").month).zfill(2)
-                    except ValueError:
-                        month = "01"
+                    month = _MONTHS.get(month.capitalize(), "01")
 
                 month = month.zfill(2)
                 day = day.zfill(2)
 
                 return f"{year}-{month}-{day}"
-            elif "MedlineDate" in pub_date:
-                medline_date = pub_date["MedlineDate"]
+            elif medline_date:
                 match = re.search(r'(\d{4})', medline_date)
                 if match:
                     return f"{match.group(1)}-01-01"
@@ -46,91 +150,97 @@ class PubMedScraper:
 
         return "Unknown"
 
-    def extract_emails(self, text: str) -> Set[str]:
-        """Extract all valid email addresses from text using simplified patterns."""
-        email_patterns = [
-            # Basic email pattern
-            re.compile(r'[\w\.-]+@[\w\.-]+\.\w+'),
-            # Emails with common prefixes
-            re.compile(r'[Ee]mail:\s*([\w\.-]+@[\w\.-]+\.\w+)'),
-            re.compile(r'[Ee]-mail:\s*([\w\.-]+@[\w\.-]+\.\w+)'),
-            # Emails in brackets or parentheses
-            re.compile(r'\[([\w\.-]+@[\w\.-]+\.\w+)\]'),
-            re.compile(r'\(([\w\.-]+@[\w\.-]+\.\w+)\)'),
-            re.compile(r'\<([\w\.-]+@[\w\.-]+\.\w+)\>')
-        ]
-        emails = set()
-        for pattern in email_patterns:
-            try:
-                matches = pattern.finditer(text)
-                for match in matches:
-                    email = match.group(1) if len(match.groups()) > 0 else match.group(0)
-                    email = email.strip('.,()<>[]{}').lower()
-                    if re.match(r'^[\w\.-]+@[\w\.-]+\.\w+$', email):
-                        emails.add(email)
-            except Exception as e:
-                logging.debug(f"Error matching email pattern {pattern}: {e}")
-                continue
-
-        return emails
+    def extract_emails(self, text: str) -> FrozenSet[str]:
+        """Extract all valid email addresses from text in a single regex pass."""
+        return _extract_emails(text)
 
     def is_company_affiliation(self, affiliation: str) -> bool:
         """Determine if an affiliation is from a company."""
-        academic_indicators = [
-            r'\b(?:university|college|institut|academy|school)\b',
-            r'\b(?:hospital|medical center|clinic)\b',
-            r'\b(?:research center|laboratory|department)\b',
-            r'\b(?:faculty|division)\b'
-        ]
-        clean_affiliation = ' '.join(affiliation.lower().split())
-        for indicator in academic_indicators:
-            if re.search(indicator, clean_affiliation, re.IGNORECASE):
-                return False
-        company_indicators = [
-            r'\b(?:pharma|pharmaceutical|biotech|biotechnology)\b',
-            r'\b(?:therapeutics|biosciences|biologics)\b',
-            r'\b(?:inc|corp|ltd|gmbh|s\.a\.|llc|co\.|company|plc)\b',
-            r'\b(?:drug discovery|r&d)\b',
-            r'\b(?:labs|laboratories)\b',
-            r'\b(?:research|development)\b'
-        ]
-        return any(re.search(indicator, clean_affiliation, re.IGNORECASE) 
-                  for indicator in company_indicators)
-
-    def fetch_pubmed_articles(self, query: str, max_results: int = 100) -> List[Dict[str, Any]]:
-        """Fetch articles from PubMed based on query."""
+        return _classify(' '.join(affiliation.lower().split()))
+
+    def fetch_pubmed_articles(self, query: str, max_results: int = 100) -> Iterator[ET.Element]:
+        """Fetch articles from PubMed based on query, yielding one <PubmedArticle> at a time.
+
+        Each element is detached from the parsed tree once the next one is requested,
+        and at most EFETCH_WORKERS raw batch responses are downloaded ahead of the
+        parser, so memory use does not grow with the number of results. Any fetch or
+        parse error is logged and re-raised, so partial results are never mistaken
+        for complete ones.
+        """
         try:
-            handle = Entrez.esearch(db="pubmed", term=query, retmax=max_results)
-            record = Entrez.read(handle)
-            handle.close()
+            with self._eutils("esearch.fcgi", term=query, retmax=max_results,
+                              retmode="json") as response:
+                record = json.load(response)
 
-            pmids = record["IdList"]
+            pmids = record["esearchresult"]["idlist"]
             if not pmids:
                 logging.info("No results found for the query.")
-                return []
+                return
 
             logging.info(f"Found {len(pmids)} articles. Fetching details...")
 
-            handle = Entrez.efetch(db="pubmed", id=",".join(pmids), rettype="xml")
-            articles = Entrez.read(handle)
-            handle.close()
-
-            return articles["PubmedArticle"]
+            batches = [pmids[i:i + self.EFETCH_BATCH_SIZE]
+                       for i in range(0, len(pmids), self.EFETCH_BATCH_SIZE)]
+            # Batches are downloaded concurrently and parsed in order; a new download
+            # starts only as an earlier one is consumed, bounding how far they run ahead
+            batches = iter(batches)
+            with ThreadPoolExecutor(max_workers=self.EFETCH_WORKERS) as executor:
+                pending = deque(executor.submit(self._fetch_batch, batch)
+                                for batch in islice(batches, self.EFETCH_WORKERS))
+                try:
+                    while pending:
+                        body = pending.popleft().result()
+                        for batch in islice(batches, 1):
+                            pending.append(executor.submit(self._fetch_batch, batch))
+                        yield from self._iter_articles(io.BytesIO(body))
+                finally:
+                    for future in pending:
+                        future.cancel()
 
         except Exception as e:
             logging.error(f"Error fetching PubMed articles: {e}")
-            return []
-
-    def extract_article_info(self, article: Dict) -> Optional[Dict[str, Any]]:
-        """Extract and validate article information."""
+            raise
+
+    def _eutils(self, utility: str, **params):
+        """POST a request to an E-utilities endpoint, honouring NCBI's rate limit."""
+        params.update(db="pubmed", tool="get-papers-list", email=self.email)
+        with self._request_lock:
+            wait = self._last_request + self.MIN_REQUEST_INTERVAL - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            self._last_request = time.monotonic()
+        return urlopen(self.EUTILS_URL + utility, data=urlencode(params).encode(),
+                       timeout=self.REQUEST_TIMEOUT)
+
+    def _fetch_batch(self, pmids: List[str]) -> bytes:
+        """Download the efetch XML for a single batch of PMIDs.
+
+        The body is read in full on the worker thread, so no connection is left
+        open and idle while earlier batches are being parsed.
+        """
+        with self._eutils("efetch.fcgi", id=",".join(pmids), retmode="xml") as response:
+            return response.read()
+
+    def _iter_articles(self, handle) -> Iterator[ET.Element]:
+        """Stream-parse an efetch response, yielding and then discarding each article."""
+        root = None
+        for event, elem in ET.iterparse(handle, events=("start", "end")):
+            if root is None:
+                root = elem
+            elif event == "end" and elem.tag == "PubmedArticle":
+                yield elem
+                root.clear()
+
+    def extract_article_info(self, article: ET.Element) -> Optional[Dict[str, Any]]:
+        """Extract and validate article information from a <PubmedArticle> element."""
         try:
-            medline = article["MedlineCitation"]
-            article_data = medline["Article"]
-            pmid = str(medline["PMID"])
+            medline = article.find("MedlineCitation")
+            article_data = medline.find("Article")
+            pmid = medline.findtext("PMID", "").strip()
             if not pmid:
                 return None
 
-            title = article_data.get("ArticleTitle", "").strip()
+            title = _element_text(article_data.find("ArticleTitle"))
             if not title:
                 return None
 
@@ -141,32 +251,35 @@ class PubMedScraper:
             non_academic_authors = []
             company_affiliations = set()
             all_emails = set()
+            # Co-authors often share an affiliation, so classify each distinct one once
+            classified = {}
 
-            if "Electronic_Mail_Address" in article_data:
-                emails = self.extract_emails(article_data["Electronic_Mail_Address"])
-                all_emails.update(emails)
-
-            authors = article_data.get("AuthorList", [])
-            for author in authors:
-                if not all(author.get(field) for field in ["ForeName", "LastName"]):
+            for author in article_data.iterfind("AuthorList/Author"):
+                fore_name = author.findtext("ForeName")
+                last_name = author.findtext("LastName")
+                if not (fore_name and last_name):
                     continue
 
-                author_name = f"{author.get('ForeName', '')} {author.get('LastName', '')}".strip()
-
-                if "AffiliationInfo" in author:
-                    author_has_company = False
-                    for aff in author["AffiliationInfo"]:
-                        affiliation = aff.get("Affiliation", "").strip()
-                        if not affiliation:
-                            continue
-                        emails = self.extract_emails(affiliation)
-                        all_emails.update(emails)
-                        if self.is_company_affiliation(affiliation):
-                            author_has_company = True
-                            company_affiliations.add(affiliation)
-
-                    if author_has_company:
-                        non_academic_authors.append(author_name)
+                author_name = f"{fore_name} {last_name}".strip()
+
+                author_has_company = False
+                for aff in author.iterfind("AffiliationInfo/Affiliation"):
+                    affiliation = _element_text(aff)
+                    if not affiliation:
+                        continue
+                    info = classified.get(affiliation)
+                    if info is None:
+                        # Normalize once; the original text is kept for display
+                        lowered = ' '.join(affiliation.lower().split())
+                        info = classified[affiliation] = (_classify(lowered), _extract_emails(lowered))
+                    is_company, emails = info
+                    all_emails.update(emails)
+                    if is_company:
+                        author_has_company = True
+                        company_affiliations.add(affiliation)
+
+                if author_has_company:
+                    non_academic_authors.append(author_name)
 
             if non_academic_authors and company_affiliations:
                 result = {
@@ -181,7 +294,7 @@ class PubMedScraper:
 
             return None
         except Exception as e:
-            logging.error(f"Error extracting info for PMID {article.get('MedlineCitation', {}).get('PMID', 'unknown')}: {e}")
+            logging.error(f"Error extracting info for PMID {article.findtext('MedlineCitation/PMID', 'unknown')}: {e}")
             return None
 
     def save_to_csv(self, data: List[Dict[str, Any]], filename: str):
@@ -190,25 +303,24 @@ class PubMedScraper:
             logging.warning("No data to save.")
             return
 
-        valid_data = [
-            entry for entry in data 
-            if all(entry.get(field) and entry[field] not in ["Unknown", "None", "", None] 
-                  for field in ["PubmedID", "Title", "Publication Date", "Non-academic Authors", 
-                              "Company Affiliations"])
-        ]
+        valid_data = [entry for entry in data
+                      if _MISSING_VALUES.isdisjoint(map(entry.get, _REQUIRED_FIELDS))]
 
         if not valid_data:
             logging.warning("No valid entries found after filtering.")
             return
 
         try:
-            with open(filename, "w", newline="", encoding="utf-8") as csvfile:
+            with open(filename, "w", newline="", encoding="utf-8",
+                      buffering=self.CSV_BUFFER_SIZE) as csvfile:
                 fieldnames = ["PubmedID", "Title", "Publication Date", 
                             "Non-academic Authors", "Company Affiliations", 
                             "Corresponding Author Email"]
-                writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-                writer.writeheader()
-                writer.writerows(valid_data)
+                writer = csv.writer(csvfile)
+                writer.writerow(fieldnames)
+                # Missing optional columns are written empty, as DictWriter's restval did
+                writer.writerows(tuple(entry.get(field, "") for field in fieldnames)
+                                 for entry in valid_data)
             logging.info(f"Results saved to {filename} with {len(valid_data)} valid entries")
         except Exception as e:
             logging.error(f"Error saving to CSV: {e}")
@@ -239,15 +351,15 @@ def main():
     scraper = PubMedScraper(email=args.email)
     logging.info(f"Starting PubMed search with query: {args.query}")
 
-    articles = scraper.fetch_pubmed_articles(args.query)
-    extracted_data = []
-
-    with ThreadPoolExecutor() as executor:
-        futures = {executor.submit(scraper.extract_article_info, article): article for article in articles}
-        for future in as_completed(futures):
-            article_info = future.result()
-            if article_info:
-                extracted_data.append(article_info)
+    # Network reads and XML parsing run ahead of extraction on a background thread
+    articles = _prefetch(scraper.fetch_pubmed_articles(args.query))
+    try:
+        # Extraction is pure-Python CPU work, so a thread pool only adds GIL contention
+        extracted_data = [info for info in map(scraper.extract_article_info, articles) if info]
+    except Exception:
+        # The error was already logged; don't save an incomplete result set
+        logging.warning("Fetching articles failed; no results saved")
+        return
 
     if extracted_data:
         scraper.save_to_csv(extracted_data, args.file)